@@ -1,13 +1,14 @@
 # mypy: disable-error-code=override
 
+from __future__ import annotations
+
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import os
-from typing import Any, TypeAlias
+from typing import TYPE_CHECKING, Any, TypeAlias
 import warnings
 
-import boto3
 from deltalake import DeltaTable, QueryBuilder
 from deltalake.warnings import ExperimentalWarning
 import polars as pl
@@ -28,6 +29,9 @@ from datarepo.core.tables.util import (
     get_storage_options,
 )
 
+if TYPE_CHECKING:
+    import boto3
+
 READ_PARQUET_RETRY_COUNT = 10
 DEFAULT_TIMEOUT = "150s"
 
@@ -1,4 +1,4 @@
-from typing import Any, Literal, Sequence, cast, NamedTuple
+from typing import Any, Iterable, Literal, Sequence, cast, NamedTuple
 
 FilterOperator = Literal[
     "=",
@@ -26,6 +26,9 @@ class Filter(NamedTuple):
 InputFilters = Sequence[Filter] | Sequence[Sequence[Filter]]
 NormalizedFilters = list[list[Filter]]
 
+# Operators taking a collection of values
+_COLLECTION_OPERATORS = ("in", "not in", "includes any", "includes all")
+
 
 def normalize_filters(filters: InputFilters | None) -> NormalizedFilters:
     """
@@ -36,13 +39,36 @@ def normalize_filters(filters: InputFilters | None) -> NormalizedFilters:
     We make a special case for the empty filter list, which is treated as no filters.
     Typically, a disjunction of no expressions should be false, but the user likely
     intends to apply no filters, and [] is easier to work with than [[]].
+
+    Collection values are converted to tuples, and sorted for "in" and "not in", so
+    that equivalent filters are equal and hashable.
     """
 
     if filters is None or len(filters) == 0:
         return []
     elif all(isinstance(f, Filter) for f in filters):
         filters = cast(Sequence[Filter], filters)
-        return [list(filters)]
+        return [[_normalize_filter(f) for f in filters]]
     else:
         filters = cast(Sequence[Sequence[Filter]], filters)
-        return [list(f) for f in filters]
+        return [[_normalize_filter(f) for f in filter_set] for filter_set in filters]
+
+
+def _normalize_filter(f: Filter) -> Filter:
+    if (
+        f.operator not in _COLLECTION_OPERATORS
+        or isinstance(f.value, str | bytes)
+        or not isinstance(f.value, Iterable)
+    ):
+        return f
+
+    values = tuple(f.value)
+    if f.operator in ("in", "not in"):
+        # The order of values doesn't matter for membership, fall back to the given
+        # order if the values aren't comparable
+        try:
+            values = tuple(sorted(values))
+        except TypeError:
+            pass
+
+    return Filter(f.column, f.operator, values)
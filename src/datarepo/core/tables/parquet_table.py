@@ -1,9 +1,10 @@
 # mypy: disable-error-code=override
 
+from __future__ import annotations
+
 from os import path
-from typing import Any, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Optional, Sequence
 
-import boto3
 import polars as pl
 
 from datarepo.core.dataframe import NlkDataFrame
@@ -26,6 +27,9 @@ from datarepo.core.tables.util import (
     get_storage_options,
 )
 
+if TYPE_CHECKING:
+    import boto3
+
 
 def pl_all(exprs: Sequence[pl.Expr]) -> pl.Expr:
     assert len(exprs) > 0
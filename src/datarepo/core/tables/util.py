@@ -1,15 +1,23 @@
+from __future__ import annotations
+
+import functools
+import time
+import weakref
+from collections import OrderedDict
 from dataclasses import dataclass
-from enum import Enum
-from typing import Any, NamedTuple, Optional
+from enum import Enum, IntEnum
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional, Sequence
 
-import boto3
 import polars as pl
 import pyarrow as pa
 
 from datarepo.core.tables.filters import Filter, NormalizedFilters
 
+if TYPE_CHECKING:
+    import boto3
+
 
-@dataclass
+@dataclass(slots=True)
 class RoapiOptions:
     use_memory_table: bool = False
     disable: bool = False
@@ -17,7 +25,7 @@ class RoapiOptions:
     reload_interval_seconds: int | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DeltaRoapiOptions(RoapiOptions):
     reload_interval_seconds: int | None = 60
 
@@ -43,144 +51,484 @@ def exactly_one_equality_filter(
     partition: Partition, filters: list[Filter]
 ) -> Optional[Filter]:
     """Checks whether exactly one equality filter exists for the given partition"""
+    if not filters:
+        return None
+
+    column = partition.column
     match = None
 
     for f in filters:
-        if f.column == partition.column:
-            # Multiple matches found, or found comparison that is not equality operator
-            if match is not None or f.operator != "=":
-                return None
-            # First match for full equality operator
-            elif f.operator == "=":
-                match = f
+        if f.column != column:
+            continue
+        # Multiple matches found, or found comparison that is not equality operator
+        if match is not None or f.operator != "=":
+            return None
+        match = f
 
     return match
 
 
-def get_storage_options(
-    boto3_session: boto3.Session | None = None,
-    endpoint_url: str | None = None,
+class _AwsCredentials(NamedTuple):
+    access_key: str
+    secret_key: str
+    token: str | None
+    region: str | None
+    fetched_at: float
+
+
+# Snapshots are reused for less than botocore's mandatory refresh window (10 minutes
+# before expiry), so a cached snapshot is still valid whenever it's handed out.
+_CREDENTIALS_TTL_SECONDS = 5 * 60
+
+_credentials_cache: weakref.WeakKeyDictionary[boto3.Session, _AwsCredentials] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_aws_credentials(boto3_session: boto3.Session) -> _AwsCredentials:
+    """Returns a recent snapshot of the session's credentials and region"""
+    now = time.monotonic()
+    cached = _credentials_cache.get(boto3_session)
+    if cached is not None and now - cached.fetched_at < _CREDENTIALS_TTL_SECONDS:
+        return cached
+
+    # Freezing reads the key, secret and token in one refresh check, and guarantees
+    # they belong together if a refresh happens concurrently
+    creds = boto3_session.get_credentials().get_frozen_credentials()
+    snapshot = _AwsCredentials(
+        access_key=creds.access_key,
+        secret_key=creds.secret_key,
+        token=creds.token,
+        region=boto3_session.region_name,
+        fetched_at=now,
+    )
+    _credentials_cache[boto3_session] = snapshot
+    return snapshot
+
+
+class _AwsOptionKeys(NamedTuple):
+    endpoint_url: str
+    access_key: str
+    secret_key: str
+    token: str
+    region: str
+
+
+_STORAGE_OPTION_KEYS = _AwsOptionKeys(
+    endpoint_url="aws_endpoint_url",
+    access_key="aws_access_key_id",
+    secret_key="aws_secret_access_key",
+    token="aws_session_token",
+    region="aws_region",
+)
+
+_PYARROW_FILESYSTEM_ARG_KEYS = _AwsOptionKeys(
+    endpoint_url="endpoint_override",
+    access_key="access_key",
+    secret_key="secret_key",
+    token="session_token",
+    region="region",
+)
+
+
+def _aws_options(
+    boto3_session: boto3.Session | None,
+    endpoint_url: str | None,
+    keys: _AwsOptionKeys,
 ) -> dict[str, str]:
-    storage_options = {}
+    # Empty options are left out, since options passed to delta-rs need to be not null
+    options: dict[str, str] = {}
 
-    if endpoint_url is not None:
-        storage_options["aws_endpoint_url"] = endpoint_url
+    if endpoint_url:
+        options[keys.endpoint_url] = endpoint_url
 
     if boto3_session is not None:
-        creds = boto3_session.get_credentials()
-        storage_options = {
-            **storage_options,
-            "aws_access_key_id": creds.access_key,
-            "aws_secret_access_key": creds.secret_key,
-            "aws_session_token": creds.token,
-            "aws_region": boto3_session.region_name,
-        }
+        creds = _get_aws_credentials(boto3_session)
+        if creds.access_key:
+            options[keys.access_key] = creds.access_key
+        if creds.secret_key:
+            options[keys.secret_key] = creds.secret_key
+        if creds.token:
+            options[keys.token] = creds.token
+        if creds.region:
+            options[keys.region] = creds.region
 
-    # Storage options passed to delta-rs need to be not null
-    storage_options = {k: v for k, v in storage_options.items() if v}
+    return options
 
-    return storage_options
+
+def get_storage_options(
+    boto3_session: boto3.Session | None = None,
+    endpoint_url: str | None = None,
+) -> dict[str, str]:
+    return _aws_options(boto3_session, endpoint_url, _STORAGE_OPTION_KEYS)
 
 
 def get_pyarrow_filesystem_args(
     boto3_session: boto3.Session | None = None,
     endpoint_url: str | None = None,
 ) -> dict[str, str]:
-    pyarrow_filesystem_args = {}
+    return _aws_options(boto3_session, endpoint_url, _PYARROW_FILESYSTEM_ARG_KEYS)
 
-    if endpoint_url is not None:
-        pyarrow_filesystem_args["endpoint_override"] = endpoint_url
 
-    if boto3_session is not None:
-        creds = boto3_session.get_credentials()
-        pyarrow_filesystem_args = {
-            **pyarrow_filesystem_args,
-            "access_key": creds.access_key,
-            "secret_key": creds.secret_key,
-            "session_token": creds.token,
-            "region": boto3_session.region_name,
+class _ColumnKind(IntEnum):
+    SCALAR = 0
+    LIST = 1
+    LARGE_LIST = 2
+
+
+class _Column(NamedTuple):
+    type: pa.DataType
+    kind: _ColumnKind
+
+
+def _column_kind(column_type: pa.DataType) -> _ColumnKind:
+    if pa.types.is_list(column_type):
+        return _ColumnKind.LIST
+    elif pa.types.is_large_list(column_type):
+        return _ColumnKind.LARGE_LIST
+    return _ColumnKind.SCALAR
+
+
+# Predicates are only cached for filters with at most this many values, so the cache
+# doesn't hold on to large "in" lists
+_MAX_CACHED_VALUES = 64
+# Maximum number of predicates cached per schema, the oldest are evicted first
+_MAX_CACHED_PREDICATES = 256
+
+
+class _SchemaCache:
+    """Column index and rendered predicates for a schema"""
+
+    __slots__ = ("columns", "predicates")
+
+    def __init__(self, schema: pa.Schema):
+        self.columns = {
+            field.name: _Column(field.type, _column_kind(field.type))
+            for field in schema
         }
+        self.predicates: OrderedDict[tuple, str | None] = OrderedDict()
+
+
+# Keyed by id(schema). Entries are removed when their schema is collected, before its id
+# can be reused, so the cache never keeps a schema alive or serves a stale entry.
+_schema_caches: dict[int, _SchemaCache] = {}
 
-    pyarrow_filesystem_args = {
-        k: v for k, v in pyarrow_filesystem_args.items() if v is not None
-    }
 
-    return pyarrow_filesystem_args
+def _schema_cache(schema: pa.Schema) -> _SchemaCache:
+    schema_id = id(schema)
+    cache = _schema_caches.get(schema_id)
+    if cache is None:
+        cache = _schema_caches[schema_id] = _SchemaCache(schema)
+        weakref.finalize(schema, _schema_caches.pop, schema_id, None)
+    return cache
 
 
-def filters_to_sql_predicate(schema: pa.Schema, filters: NormalizedFilters) -> str:
+def _freeze_value(value: Any) -> Any:
+    """Converts a filter value to a hashable cache key"""
+    if isinstance(value, list | tuple):
+        return tuple([_freeze_value(element) for element in value])
+    # Values are rendered with str(), so key on that rather than equality, which
+    # holds for values that render differently, e.g. 1 and 1.0 or Decimal("1.0")
+    # and Decimal("1.00")
+    return (type(value), str(value))
+
+
+def _predicate_cache_key(filters: NormalizedFilters) -> tuple | None:
+    """Returns a hashable key for the filters, or None if they shouldn't be cached"""
+    key: list[Any] = []
+    num_values = 0
+    for filter_set in filters:
+        for f in filter_set:
+            value = f.value
+            if isinstance(value, list | tuple):
+                num_values += len(value)
+                if num_values > _MAX_CACHED_VALUES:
+                    return None
+                value_key = _freeze_value(value)
+            else:
+                value_key = (type(value), str(value))
+            key.append((f.column, f.operator, value_key))
+        # Marks the end of each conjunction
+        key.append(None)
+    return tuple(key)
+
+
+# Conjunctions that simplify to a constant are rendered as these literals
+_TRUE = "true"
+_FALSE = "false"
+
+
+def filters_to_sql_predicate(
+    schema: pa.Schema, filters: NormalizedFilters
+) -> str | None:
+    """
+    Renders the filters as a SQL predicate, or returns None if the filters are always
+    true and no predicate needs to be applied.
+    """
     if not filters:
-        return "true"
+        return None
 
-    return " or ".join(
-        filters_to_sql_conjunction(schema, filter_set) for filter_set in filters
+    key = _predicate_cache_key(filters)
+    if key is None:
+        return _build_sql_predicate(schema, filters)
+
+    predicates = _schema_cache(schema).predicates
+    try:
+        return predicates[key]
+    except KeyError:
+        pass
+
+    predicate = predicates[key] = _build_sql_predicate(schema, filters)
+    if len(predicates) > _MAX_CACHED_PREDICATES:
+        predicates.popitem(last=False)
+    return predicate
+
+
+def _build_sql_predicate(schema: pa.Schema, filters: NormalizedFilters) -> str | None:
+    if len(filters) == 1:
+        conjunction = filters_to_sql_conjunction(schema, filters[0])
+        return None if conjunction == _TRUE else conjunction
+
+    # Identical disjuncts only need to be evaluated once
+    conjunctions = dict.fromkeys(
+        [filters_to_sql_conjunction(schema, filter_set) for filter_set in filters]
     )
+    if _TRUE in conjunctions:
+        return None
+
+    conjunctions.pop(_FALSE, None)
+    if not conjunctions:
+        return _FALSE
+
+    return " or ".join(conjunctions)
 
 
 def filters_to_sql_conjunction(schema: pa.Schema, filters: list[Filter]) -> str:
     if not filters:
-        return "true"
+        return _TRUE
+
+    # Validate every filter up front, so simplifying to a constant can't hide an
+    # invalid column or operator
+    columns = _schema_cache(schema).columns
+    for f in filters:
+        _resolve_filter(columns, f.column, f.operator)
+
+    simplified_filters = _simplify_conjunction(columns, filters)
+    if simplified_filters is None:
+        return _FALSE
+
+    # Emit the cheapest filters first so the engine can short circuit sooner. The sort
+    # is stable, so filters of the same cost keep the user's order.
+    simplified_filters.sort(key=_filter_cost)
+
+    # Identical filters only need to be evaluated once
+    exprs = dict.fromkeys([_render_filter(columns, f) for f in simplified_filters])
+    # A single filter is already parenthesized, so it's rendered as is
+    if len(exprs) == 1:
+        return next(iter(exprs))
 
-    exprs = (filter_to_sql_expr(schema, f) for f in filters)
     conjunction_expr = " and ".join(exprs)
     return f"({conjunction_expr})"
 
 
-def filter_to_sql_expr(schema: pa.Schema, f: Filter) -> str:
-    column = f.column
-    if column not in schema.names:
-        raise ValueError(f"Invalid column name {column}")
+# Relative cost of evaluating each operator per row
+_OPERATOR_COSTS = {
+    "=": 0,
+    "!=": 0,
+    "<": 1,
+    "<=": 1,
+    ">": 1,
+    ">=": 1,
+    "in": 2,
+    "not in": 2,
+    "includes": 3,
+    "includes any": 3,
+    "includes all": 3,
+    "contains": 4,
+}
 
-    column_type = schema.field(column).type
-    if f.operator in (
-        "=",
-        "!=",
-        "<",
-        "<=",
-        ">",
-        ">=",
-        "in",
-        "not in",
-    ):
-        value_str = value_to_sql_expr(f.value, column_type)
-        return f"({column} {f.operator} {value_str})"
 
-    elif f.operator == "contains":
-        assert isinstance(f.value, str)
-        escaped_str = escape_str_for_sql(f.value)
-        like_str = f"'%{escaped_str}%'"
-        return f"({column} like {like_str})"
+def _filter_cost(f: Filter) -> int:
+    return _OPERATOR_COSTS.get(f.operator, 0)
 
-    elif f.operator in ("includes", "includes any", "includes all"):
-        assert pa.types.is_list(column_type) or pa.types.is_large_list(column_type)
 
-        values: list[Any]
-        if f.operator == "includes":
-            values = [f.value]
+def _simplify_conjunction(
+    columns: dict[str, _Column], filters: list[Filter]
+) -> list[Filter] | None:
+    """
+    Folds the "=" and "in" filters on each column into a single filter on the
+    intersection of their values.
+
+    Returns None if the intersection is empty, i.e. the conjunction is always false.
+    """
+    simplified = list(filters)
+    membership_filters: dict[str, list[Filter]] = {}
+    for f in filters:
+        if f.operator in ("=", "in"):
+            membership_filters.setdefault(f.column, []).append(f)
+
+    for column, column_filters in membership_filters.items():
+        if len(column_filters) < 2 or column not in columns:
+            continue
+
+        values = _intersect_membership_values(column_filters, columns[column].type)
+        if values is None:
+            continue
+        elif not values:
+            return None
+
+        if len(values) == 1:
+            folded = Filter(column, "=", values[0])
         else:
-            assert isinstance(f.value, list | tuple)
-            values = list(f.value)
+            folded = Filter(column, "in", tuple(values))
 
-        # NOTE: for includes any/all, we join multiple array_contains with or/and
-        value_exprs = (
-            value_to_sql_expr(value, column_type.value_type) for value in values
-        )
-        include_exprs = (
-            f"array_contains({column}, {value_expr})" for value_expr in value_exprs
+        # Replace the first of the folded filters in place to keep the user's order
+        folded_ids = {id(f) for f in column_filters}
+        first_id = id(column_filters[0])
+        simplified = [
+            folded if id(f) == first_id else f
+            for f in simplified
+            if id(f) not in folded_ids or id(f) == first_id
+        ]
+
+    return simplified
+
+
+def _intersect_membership_values(
+    filters: list[Filter], column_type: pa.DataType
+) -> list[Any] | None:
+    """
+    Intersects the values of "=" and "in" filters on one column by their rendered SQL
+    literals, in the order of the first filter. Returns None if the filters can't be
+    folded.
+    """
+    literal_maps = []
+    for f in filters:
+        if f.operator == "=":
+            values = [f.value]
+        elif isinstance(f.value, list | tuple):
+            values = f.value
+        else:
+            return None
+        literal_maps.append(
+            {value_to_sql_expr(value, column_type): value for value in values}
         )
-        join_operator = " or " if f.operator == "includes any" else " and "
-        conjunction_expr = join_operator.join(include_exprs)
 
-        return f"({conjunction_expr})"
+    first_literals, *other_literals = literal_maps
+    intersection = [
+        value
+        for literal, value in first_literals.items()
+        if all(literal in literals for literals in other_literals)
+    ]
+
+    # Different literals are only different values for string columns, e.g. 1 and 1.0
+    # are the same float, so other columns are only folded if no value is dropped
+    if not pa.types.is_string(column_type) and any(
+        len(literals) != len(intersection) for literals in literal_maps
+    ):
+        return None
+
+    return intersection
+
+
+def _resolve_filter(
+    columns: dict[str, _Column], column: str, operator: str
+) -> tuple[Callable[[str, str, pa.DataType, Any], str], pa.DataType]:
+    """Returns the handler and column type for a filter, raising if it's invalid"""
+    if column not in columns:
+        raise ValueError(f"Invalid column name {column}")
+
+    handler = _OPERATOR_HANDLERS.get(operator)
+    if handler is None:
+        raise ValueError(f"Invalid operator {operator}")
+
+    column_type, kind = columns[column]
+    if handler is _includes_to_sql_expr:
+        assert kind in (_ColumnKind.LIST, _ColumnKind.LARGE_LIST)
+
+    return handler, column_type
+
+
+def _render_filter(columns: dict[str, _Column], f: Filter) -> str:
+    handler, column_type = _resolve_filter(columns, f.column, f.operator)
+    return handler(f.column, f.operator, column_type, f.value)
+
+
+def filter_to_sql_expr(schema: pa.Schema, f: Filter) -> str:
+    return _render_filter(_schema_cache(schema).columns, f)
+
+
+def _comparison_to_sql_expr(
+    column: str, operator: str, column_type: pa.DataType, value: Any
+) -> str:
+    value_str = value_to_sql_expr(value, column_type)
+    return f"({column} {operator} {value_str})"
+
 
+def _contains_to_sql_expr(
+    column: str, operator: str, column_type: pa.DataType, value: Any
+) -> str:
+    assert isinstance(value, str)
+    return f"({column} like {_contains_like_pattern(value)})"
+
+
+@functools.lru_cache(maxsize=4096)
+def _contains_like_pattern(value: str) -> str:
+    escaped_str = escape_str_for_sql(_escape_like(value))
+    return f"'%{escaped_str}%'"
+
+
+_LIKE_ESCAPE = str.maketrans({"\\": "\\\\", "%": "\\%", "_": "\\_"})
+
+
+def _escape_like(value: str) -> str:
+    """Escapes LIKE wildcards so the value is matched literally"""
+    return value.translate(_LIKE_ESCAPE)
+
+
+def _includes_to_sql_expr(
+    column: str, operator: str, column_type: pa.DataType, value: Any
+) -> str:
+    values: Sequence[Any]
+    if operator == "includes":
+        values = (value,)
     else:
-        raise ValueError(f"Invalid operator {f.operator}")
+        assert isinstance(value, list | tuple)
+        values = value
+
+    # NOTE: for includes any/all, we join multiple array_contains with or/and
+    value_type = column_type.value_type
+    call_prefix = f"array_contains({column}, "
+    include_exprs = [
+        f"{call_prefix}{value_to_sql_expr(value, value_type)})" for value in values
+    ]
+    join_operator = " or " if operator == "includes any" else " and "
+    conjunction_expr = join_operator.join(include_exprs)
+
+    return f"({conjunction_expr})"
+
+
+# Maps each filter operator to the function rendering it, so dispatch is a single lookup
+_OPERATOR_HANDLERS: dict[str, Callable[[str, str, pa.DataType, Any], str]] = {
+    "=": _comparison_to_sql_expr,
+    "!=": _comparison_to_sql_expr,
+    "<": _comparison_to_sql_expr,
+    "<=": _comparison_to_sql_expr,
+    ">": _comparison_to_sql_expr,
+    ">=": _comparison_to_sql_expr,
+    "in": _comparison_to_sql_expr,
+    "not in": _comparison_to_sql_expr,
+    "contains": _contains_to_sql_expr,
+    "includes": _includes_to_sql_expr,
+    "includes any": _includes_to_sql_expr,
+    "includes all": _includes_to_sql_expr,
+}
 
 
 def value_to_sql_expr(value: Any, value_type: pa.DataType) -> str:
     if isinstance(value, list | tuple):
         elements_str = ", ".join(
-            value_to_sql_expr(element, value_type) for element in value
+            [value_to_sql_expr(element, value_type) for element in value]
         )
         value_str = f"({elements_str})"
     else:
@@ -1,3 +1,8 @@
+import gc
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock
+
 import pyarrow as pa
 import pytest
 
@@ -8,8 +13,12 @@ from datarepo.core.tables.filters import (
 )
 from datarepo.core.tables.util import (
     Filter,
+    _schema_cache,
+    _schema_caches,
     filter_to_sql_expr,
     filters_to_sql_predicate,
+    get_pyarrow_filesystem_args,
+    get_storage_options,
 )
 
 test_schema = pa.schema(
@@ -49,6 +58,12 @@ class TestUtil:
                 Filter("str_col", "contains", "x'"),
                 "(str_col like '%x''%')",
             ),
+            # LIKE wildcards in the value are matched literally
+            (
+                test_schema,
+                Filter("str_col", "contains", "50%_off\\"),
+                "(str_col like '%50\\%\\_off\\\\%')",
+            ),
             # Test list columns
             (
                 test_schema,
@@ -81,10 +96,50 @@ class TestUtil:
 
         assert "Invalid column name invalid_col" in str(e.value)
 
+    def test_filter_to_expr_raises_invalid_operator(self):
+        with pytest.raises(ValueError) as e:
+            filter_to_sql_expr(test_schema, Filter("int_col", "~", 0))  # type: ignore
+
+        assert "Invalid operator ~" in str(e.value)
+
+    @pytest.mark.parametrize(
+        ("filters", "expected"),
+        [
+            (
+                [
+                    [
+                        Filter("invalid_col", "=", 1),
+                        Filter("str_col", "=", "a"),
+                        Filter("str_col", "=", "b"),
+                    ]
+                ],
+                "Invalid column name invalid_col",
+            ),
+            (
+                [
+                    [
+                        Filter("int_col", "~", 1),  # type: ignore
+                        Filter("str_col", "=", "a"),
+                        Filter("str_col", "=", "b"),
+                    ],
+                    [Filter("int_col", "=", 3)],
+                ],
+                "Invalid operator ~",
+            ),
+        ],
+    )
+    def test_filter_to_expr_raises_contradictory_conjunction(
+        self, filters: NormalizedFilters, expected: str
+    ):
+        with pytest.raises(ValueError) as e:
+            filters_to_sql_predicate(test_schema, filters)
+
+        assert expected in str(e.value)
+
     @pytest.mark.parametrize(
         ("schema", "filters", "expected"),
         [
-            (test_schema, [[Filter("str_col", "=", "x")]], "((str_col = 'x'))"),
+            (test_schema, [[Filter("str_col", "=", "x")]], "(str_col = 'x')"),
             (
                 test_schema,
                 [[Filter("str_col", "=", "x"), Filter("int_col", "=", 123)]],
@@ -96,15 +151,126 @@ class TestUtil:
                     [Filter("str_col", "=", "x")],
                     [Filter("int_col", "=", 123), Filter("int_col", "<", 456)],
                 ],
-                "((str_col = 'x')) or ((int_col = 123) and (int_col < 456))",
+                "(str_col = 'x') or ((int_col = 123) and (int_col < 456))",
+            ),
+            # Duplicate filters and disjuncts are dropped
+            (
+                test_schema,
+                [
+                    [Filter("int_col", "<", 5), Filter("int_col", "<", 5)],
+                    [Filter("int_col", "<", 5)],
+                ],
+                "(int_col < 5)",
+            ),
+            # Equality and in filters on the same column are intersected
+            (
+                test_schema,
+                [
+                    [
+                        Filter("str_col", "in", ("a", "b", "c")),
+                        Filter("int_col", "=", 1),
+                        Filter("str_col", "in", ["c", "b", "d"]),
+                    ]
+                ],
+                "((int_col = 1) and (str_col in ('b', 'c')))",
+            ),
+            (
+                test_schema,
+                [[Filter("str_col", "=", "a"), Filter("str_col", "in", ("a", "b"))]],
+                "(str_col = 'a')",
+            ),
+            (
+                test_schema,
+                [[Filter("str_col", "=", "a"), Filter("str_col", "=", "b")]],
+                "false",
+            ),
+            # Values are compared as rendered, not by python equality
+            (
+                test_schema,
+                [
+                    [
+                        Filter("str_col", "=", Decimal("1.0")),
+                        Filter("str_col", "=", Decimal("1.00")),
+                    ]
+                ],
+                "false",
+            ),
+            # Different literals can be equal for other columns, e.g. 1 and 01, so
+            # they're only folded if no value is dropped
+            (
+                test_schema,
+                [[Filter("int_col", "in", (1, 2)), Filter("int_col", "in", [2, 1])]],
+                "(int_col in (1, 2))",
+            ),
+            (
+                test_schema,
+                [[Filter("int_col", "=", "01"), Filter("int_col", "=", "1")]],
+                "((int_col = 01) and (int_col = 1))",
+            ),
+            # Cheaper filters are emitted first
+            (
+                test_schema,
+                [
+                    [
+                        Filter("str_col", "contains", "x"),
+                        Filter("list_col", "includes", 1),
+                        Filter("int_col", "in", (1, 2)),
+                        Filter("int_col", ">", 0),
+                        Filter("str_col", "!=", "y"),
+                    ]
+                ],
+                "((str_col != 'y') and (int_col > 0) and (int_col in (1, 2)) and "
+                "(array_contains(list_col, 1)) and (str_col like '%x%'))",
+            ),
+            # Always true filters don't need a predicate
+            (test_schema, [], None),
+            (test_schema, [[Filter("str_col", "=", "x")], []], None),
+            # Always false disjuncts are dropped
+            (
+                test_schema,
+                [
+                    [Filter("str_col", "=", "a"), Filter("str_col", "=", "b")],
+                    [Filter("int_col", "=", 1)],
+                ],
+                "(int_col = 1)",
             ),
         ],
     )
     def test_filters_to_sql_predicate(
-        self, schema: pa.Schema, filters: NormalizedFilters, expected: str
+        self, schema: pa.Schema, filters: NormalizedFilters, expected: str | None
     ):
         assert filters_to_sql_predicate(schema, filters) == expected
 
+    def test_filters_to_sql_predicate_cached(self):
+        schema = pa.schema([("int_col", pa.int64()), ("float_col", pa.float64())])
+
+        # Values that compare equal but render differently should not share an entry
+        assert (
+            filters_to_sql_predicate(schema, [[Filter("float_col", "=", 1.0)]])
+            == "(float_col = 1.0)"
+        )
+        assert (
+            filters_to_sql_predicate(schema, [[Filter("float_col", "=", 1)]])
+            == "(float_col = 1)"
+        )
+
+        # Equal values that render differently should not share an entry either
+        str_schema = pa.schema([("str_col", pa.string())])
+        for value in (
+            Decimal("1.0"),
+            Decimal("1.00"),
+            datetime(2024, 1, 1, 0, tzinfo=timezone.utc),
+            datetime(2024, 1, 1, 1, tzinfo=timezone(timedelta(hours=1))),
+        ):
+            assert (
+                filters_to_sql_predicate(str_schema, [[Filter("str_col", "=", value)]])
+                == f"(str_col = '{value}')"
+            )
+
+        filters = [[Filter("int_col", "in", [1, 2])]]
+        first = filters_to_sql_predicate(schema, filters)
+        assert filters_to_sql_predicate(schema, filters) is first
+
     @pytest.mark.parametrize(
         ("filters", "expected"),
         [
@@ -132,9 +298,68 @@ class TestUtil:
                     [Filter("b", "=", 2), Filter("c", "=", 3)],
                 ],
             ),
+            # Collection values are frozen to tuples, and sorted for in/not in
+            (
+                [Filter("a", "in", [3, 1, 2]), Filter("b", "not in", {"y", "x"})],
+                [[Filter("a", "in", (1, 2, 3)), Filter("b", "not in", ("x", "y"))]],
+            ),
+            (
+                [Filter("a", "includes all", [3, 1]), Filter("b", "in", [2, "x"])],
+                [[Filter("a", "includes all", (3, 1)), Filter("b", "in", (2, "x"))]],
+            ),
+            ([Filter("a", "in", "xy")], [[Filter("a", "in", "xy")]]),
         ],
     )
     def test_normalize_filters(
         self, filters: InputFilters, expected: NormalizedFilters
     ):
         assert normalize_filters(filters) == expected
+
+    def test_filters_to_sql_predicate_large_values_not_cached(self):
+        schema = pa.schema([("int_col", pa.int64())])
+        values = tuple(range(100))
+
+        assert filters_to_sql_predicate(
+            schema, [[Filter("int_col", "in", values)]]
+        ) == "(int_col in ({}))".format(", ".join(str(v) for v in values))
+        assert not _schema_cache(schema).predicates
+
+    def test_schema_cache_dropped_with_schema(self):
+        schema = pa.schema([("int_col", pa.int64())])
+        filters_to_sql_predicate(schema, [[Filter("int_col", "=", 1)]])
+        schema_id = id(schema)
+        assert schema_id in _schema_caches
+
+        del schema
+        gc.collect()
+        assert schema_id not in _schema_caches
+
+    def test_filters_to_sql_predicate_varying_values(self):
+        # Queries that only differ in their values must not share a cached predicate
+        for value in (1, 2, 3):
+            filters = [[Filter("int_col", ">", value), Filter("str_col", "=", "x")]]
+            assert (
+                filters_to_sql_predicate(test_schema, filters)
+                == f"((str_col = 'x') and (int_col > {value}))"
+            )
+
+    def test_aws_options_cache_credentials(self):
+        session = MagicMock()
+        session.region_name = "us-west-2"
+        frozen_creds = session.get_credentials.return_value.get_frozen_credentials
+        frozen_creds.return_value = MagicMock(
+            access_key="key", secret_key="secret", token=None
+        )
+
+        assert get_storage_options(session, endpoint_url="http://localhost") == {
+            "aws_endpoint_url": "http://localhost",
+            "aws_access_key_id": "key",
+            "aws_secret_access_key": "secret",
+            "aws_region": "us-west-2",
+        }
+        assert get_pyarrow_filesystem_args(session) == {
+            "access_key": "key",
+            "secret_key": "secret",
+            "region": "us-west-2",
+        }
+        session.get_credentials.assert_called_once()